@@ -1,42 +1,169 @@
 import os
+import errno
 from pathlib import Path
 import hashlib
-import binascii
-from flask import Flask, request, jsonify, Response, send_from_directory, session
+from flask import Flask, request, jsonify, Response, send_from_directory, send_file, session
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from flask.json.provider import JSONProvider
+import orjson
+import decimal
 import mimetypes
-import re
 from datetime import datetime
+import time
+import threading
 from flask_socketio import SocketIO, emit, join_room, leave_room
-import base64
-import uuid
+import secrets
 from metadata_utils import extract_metadata
-import zipfile
-import io
+from zipstream import ZipStream, ZIP_STORED
+import tempfile
+import shutil
+import atexit
 import string
-import random
+import re
+import stat
+
+
+def orjson_default(obj):
+    """Serialize the few types orjson rejects but metadata extractors return."""
+    if isinstance(obj, float):
+        return float(obj)  # float subclasses, e.g. PyPDF2's FloatObject
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    JSON provider backed by orjson. It is shared by Flask's jsonify and the
+    Socket.IO packet encoder so every response and event skips the stdlib
+    encoder. Non-string keys are allowed because EXIF tags can be integers.
+    """
+    options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=orjson_default, option=self.options).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=orjson_default, option=self.options),
+            mimetype='application/json'
+        )
+
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
-socketio = SocketIO(app, cors_allowed_origins="*", ping_timeout=60, ping_interval=25)
+app.json = OrjsonProvider(app)
+socketio = SocketIO(app, async_mode='eventlet', cors_allowed_origins="*", ping_timeout=60, ping_interval=25, json=app.json)
 BASE_DIR = Path(__file__).resolve().parent
 FRONTEND_DIST = BASE_DIR / 'frontend' / 'dist'
-app.config['UPLOAD_FOLDER'] = str(BASE_DIR)
+# Stored files live in a private folder named by file_id and are opened only
+# while being read; tmpfs keeps them in RAM but outside the Python heap, and
+# the path lets downloads go out through send_file (sendfile() under gunicorn).
+# ROPIX_STORAGE_DIR overrides the default of /dev/shm (or the system temp dir).
+STORAGE_ROOT = os.environ.get('ROPIX_STORAGE_DIR') or ('/dev/shm' if os.path.isdir('/dev/shm') else None)
+
+
+def storage_parent(root):
+    """
+    Return the directory this app owns under root, creating it if needed.
+    Process folders go inside it so the stale sweep never looks at anything
+    else in root. Returns None if the path exists but isn't ours (e.g. someone
+    else pre-created it in a shared /tmp).
+    """
+    parent = os.path.join(root or tempfile.gettempdir(), f'ropix-storage-{os.getuid()}')
+    os.makedirs(parent, mode=0o700, exist_ok=True)
+    info = os.lstat(parent)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        return None
+    return parent
+
+
+# Process folders are <pid>-<mkdtemp suffix>; nothing else is ever swept.
+STORAGE_FOLDER_NAME = re.compile(r'^(\d+)-[a-z0-9_]{8}$')
+
+def sweep_stale_storage(parent):
+    """
+    Remove storage folders left by server processes that are gone. atexit
+    cleanup doesn't run after SIGKILL or a crash, so without this they would
+    keep holding tmpfs RAM across restarts.
+    """
+    for entry in os.scandir(parent):
+        match = STORAGE_FOLDER_NAME.match(entry.name)
+        if not match or not entry.is_dir(follow_symlinks=False):
+            continue
+        pid = int(match.group(1))
+        if pid == os.getpid():
+            continue
+        try:
+            os.kill(pid, 0)
+            continue
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            continue  # alive, owned by another user
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+STORAGE_PARENT = storage_parent(STORAGE_ROOT) if os.name == 'posix' else None
+if STORAGE_PARENT:
+    sweep_stale_storage(STORAGE_PARENT)
+    app.config['STORAGE_FOLDER'] = tempfile.mkdtemp(prefix=f'{os.getpid()}-', dir=STORAGE_PARENT)
+else:
+    app.config['STORAGE_FOLDER'] = tempfile.mkdtemp(prefix='ropix-', dir=STORAGE_ROOT)
+atexit.register(shutil.rmtree, app.config['STORAGE_FOLDER'], ignore_errors=True)
 
 # =============================================================================
 # ROOM-BASED FILE SHARING SYSTEM
 # =============================================================================
 
-# Room storage: { room_code: { files: {}, devices: {sid: info}, created_at, last_activity } }
+# Room storage: { room_code: { files: {}, file_listing: {}, devices: {sid: info}, device_list_cache, lock, created_at, last_activity } }
+# file_listing mirrors files but only holds the prebuilt broadcast payloads, so
+# listings and join replays never have to walk the full file records.
 rooms = {}
 
 # Track socket ID to room mapping for disconnect handling
 socket_to_room = {}
 
+# (unix second, ISO string) of the last formatted timestamp
+_cached_timestamp = (None, '')
+
+def now_iso():
+    """Current local time as an ISO string, formatted at most once per second."""
+    global _cached_timestamp
+    second = int(time.time())
+    if _cached_timestamp[0] != second:
+        _cached_timestamp = (second, datetime.fromtimestamp(second).isoformat())
+    return _cached_timestamp[1]
+
+ROOM_CODE_ALPHABET = string.ascii_uppercase + string.digits
+ROOM_CODE_LENGTH = 6
+# Bytes at or above the largest multiple of the alphabet size are rejected,
+# so byte % len(ROOM_CODE_ALPHABET) stays uniform
+ROOM_CODE_BYTE_LIMIT = 256 - 256 % len(ROOM_CODE_ALPHABET)
+
+def random_room_code():
+    """
+    Draw a room code from os.urandom. Room codes are the only thing guarding a
+    room, so they come from the OS CSPRNG; one read almost always suffices
+    since only 4 of 256 byte values are rejected.
+    """
+    code = ''
+    while len(code) < ROOM_CODE_LENGTH:
+        code += ''.join(
+            ROOM_CODE_ALPHABET[byte % len(ROOM_CODE_ALPHABET)]
+            for byte in os.urandom(ROOM_CODE_LENGTH)
+            if byte < ROOM_CODE_BYTE_LIMIT
+        )
+    return code[:ROOM_CODE_LENGTH]
+
 def generate_room_code():
     """Generate a unique 6-character room code."""
-    chars = string.ascii_uppercase + string.digits
     while True:
-        code = ''.join(random.choices(chars, k=6))
+        code = random_room_code()
         if code not in rooms:
             return code
 
@@ -50,64 +177,99 @@ def set_current_room(room_code):
 
 def get_room_files(room_code):
     """Get all files in a room."""
-    if room_code and room_code in rooms:
-        return rooms[room_code].get('files', {})
-    return {}
+    room = rooms.get(room_code)
+    return room['files'] if room else {}
 
 def get_room_devices(room_code):
     """Get all devices in a room."""
-    if room_code and room_code in rooms:
-        return rooms[room_code].get('devices', {})
-    return {}
+    room = rooms.get(room_code)
+    return room['devices'] if room else {}
 
 MAX_DEVICES_PER_ROOM = 10
 
 def add_device_to_room(room_code, sid, device_info):
     """Add a device to a room. Returns False if room is full."""
-    if room_code and room_code in rooms:
-        # Check device limit
-        current_devices = len(rooms[room_code].get('devices', {}))
-        if current_devices >= MAX_DEVICES_PER_ROOM:
+    room = rooms.get(room_code)
+    if room is None:
+        return False
+    
+    with room['lock']:
+        # Check device limit; the lock keeps concurrent joins from overfilling the room
+        if len(room['devices']) >= MAX_DEVICES_PER_ROOM:
             return False  # Room is full
         
-        rooms[room_code]['devices'][sid] = {
+        room['device_list_cache'] = None
+        room['devices'][sid] = {
+            'short_id': sid[:8],  # Shortened ID for privacy
             'name': device_info.get('name', 'Unknown Device'),
             'platform': device_info.get('platform', 'Unknown'),
-            'joined_at': datetime.now().isoformat()
+            'joined_at': now_iso()
         }
         socket_to_room[sid] = room_code
-        rooms[room_code]['last_activity'] = datetime.now().isoformat()
-        return True
-    return False
+        room['last_activity'] = now_iso()
+    return True
 
 def remove_device_from_room(sid):
     """Remove a device from its room."""
     room_code = socket_to_room.pop(sid, None)
-    if room_code and room_code in rooms:
-        rooms[room_code]['devices'].pop(sid, None)
-        return room_code
-    return None
+    room = rooms.get(room_code)
+    if room is None:
+        return None
+    with room['lock']:
+        room['devices'].pop(sid, None)
+        room['device_list_cache'] = None
+    return room_code
+
+def get_device_list(room_code):
+    """
+    Get the device list broadcast in devices_updated. It is rebuilt only after
+    a device joins or leaves; the add/remove helpers reset the cache.
+    """
+    room = rooms[room_code]
+    with room['lock']:
+        if room['device_list_cache'] is None:
+            room['device_list_cache'] = [
+                {'id': info['short_id'], 'name': info.get('name', 'Unknown'), 'platform': info.get('platform')}
+                for info in room['devices'].values()
+            ]
+        return room['device_list_cache']
 
 def add_file_to_room(room_code, file_id, metadata):
     """Add a file to a room."""
-    if room_code and room_code in rooms:
-        rooms[room_code]['files'][file_id] = metadata
-        rooms[room_code]['last_activity'] = datetime.now().isoformat()
-        return True
-    return False
+    room = rooms.get(room_code)
+    if room is None:
+        return False
+    with room['lock']:
+        room['files'][file_id] = metadata
+        room['file_listing'][file_id] = metadata['broadcast_payload']
+        room['last_activity'] = now_iso()
+    return True
 
 def remove_file_from_room(room_code, file_id):
     """Remove a file from a room."""
-    if room_code and room_code in rooms:
-        if file_id in rooms[room_code]['files']:
-            del rooms[room_code]['files'][file_id]
-            return True
-    return False
-
-# Legacy compatibility - keep file_metadata as alias
-file_metadata = {}  # This will be deprecated, rooms store files now
+    room = rooms.get(room_code)
+    if room is None:
+        return False
+    with room['lock']:
+        metadata = room['files'].pop(file_id, None)
+        if metadata is None:
+            return False
+        room['file_listing'].pop(file_id, None)
+    discard_stored_file(metadata['path'])
+    return True
+
+def discard_stored_file(path):
+    """Unlink a stored file; readers that already opened it keep their data."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
 
 CHUNK_SIZE = 64 * 1024  # 64KB chunks
+CHUNKS_PER_EMIT = 16  # chunks grouped into one file_chunk_batch event (1MB)
+
+# File types whose metadata is extracted at upload rather than on first /metadata request
+UPLOAD_METADATA_TYPES = ('image', 'audio')
 
 # Supported preview file types with MIME type validation
 PREVIEW_TYPES = {
@@ -149,30 +311,38 @@ PREVIEW_TYPES = {
     }
 }
 
-def get_file_type(filename):
-    """Determine the type of file based on its extension"""
+def build_type_index(key):
+    """Flatten PREVIEW_TYPES into a value -> file type dict; the first listed type wins."""
+    index = {}
+    for file_type, info in PREVIEW_TYPES.items():
+        for value in info[key]:
+            index.setdefault(value, file_type)
+    return index
+
+EXT_TO_TYPE = build_type_index('extensions')
+MIME_TO_TYPE = build_type_index('mime_types')
+
+# Distinguishes "no MIME guess passed" from a guess that came back as None
+_UNSET = object()
+
+def get_file_type(filename, mime_type=_UNSET):
+    """
+    Determine the type of file based on its extension. Callers that already
+    guessed the MIME type can pass it in, even if the guess was None, to skip
+    a second lookup.
+    """
     if not filename:
         return 'other'
         
     ext = os.path.splitext(filename)[1].lower()
-    
-    # Check if it's a directory
-    if not ext and os.path.isdir(os.path.join(app.config['UPLOAD_FOLDER'], filename)):
-        return 'folder'
-        
-    # Check file extension against known types
-    for file_type, info in PREVIEW_TYPES.items():
-        if ext in info['extensions']:
-            return file_type
+    file_type = EXT_TO_TYPE.get(ext)
+    if file_type:
+        return file_type
             
     # Try to guess based on mime type
-    mime_type = mimetypes.guess_type(filename)[0]
-    if mime_type:
-        for file_type, info in PREVIEW_TYPES.items():
-            if mime_type in info['mime_types']:
-                return file_type
-                
-    return 'other'
+    if mime_type is _UNSET:
+        mime_type = mimetypes.guess_type(filename)[0]
+    return MIME_TO_TYPE.get(mime_type, 'other')
 
 def get_file_icon(file_type):
     """Get the appropriate icon class for the file type"""
@@ -191,56 +361,20 @@ def get_file_icon(file_type):
     return icon_map.get(file_type, 'fa-file')
 
 
-def format_file_size(size):
-    """Format file size in human-readable format"""
-    try:
-        size = float(size)  # Ensure size is a number
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size < 1024.0:
-                return f"{size:.2f} {unit}"
-            size /= 1024.0
-        return f"{size:.2f} TB"
-    except (ValueError, TypeError):
-        return "0 B"  # Return a default value if size is invalid
-
-
 def compute_manifest_signature(manifest):
     """
     Build a deterministic signature for the manifest so receivers can verify
     they got an untampered chunk list. We purposely rely on predictable strings
     instead of arbitrary JSON ordering to make client-side verification easy.
     """
-    chunk_hashes = '|'.join(chunk['hash'] for chunk in manifest['chunks'])
-    payload = f"{manifest['file_id']}:{manifest['total_size']}:{len(manifest['chunks'])}:{chunk_hashes}"
-    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
-
-
-def compute_chunk_manifest(file_id, file_bytes):
-    """Split a file buffer into hashed chunks and return manifest + signature."""
-    chunks = []
-    offset = 0
-    index = 0
-    total_size = len(file_bytes)
-
-    while offset < total_size:
-        chunk_bytes = file_bytes[offset:offset + CHUNK_SIZE]
-        chunk_hash = hashlib.sha256(chunk_bytes).hexdigest()
-        chunks.append({
-            'index': index,
-            'offset': offset,
-            'size': len(chunk_bytes),
-            'hash': chunk_hash
-        })
-        index += 1
-        offset += len(chunk_bytes)
-
-    manifest = {
-        'file_id': file_id,
-        'chunk_size': CHUNK_SIZE,
-        'total_size': total_size,
-        'chunks': chunks
-    }
-    return manifest, compute_manifest_signature(manifest)
+    chunks = manifest['chunks']
+    # Feed the hasher piece by piece rather than joining one large payload string
+    hasher = hashlib.sha256(f"{manifest['file_id']}:{manifest['total_size']}:{len(chunks)}:".encode('utf-8'))
+    for position, chunk in enumerate(chunks):
+        if position:
+            hasher.update(b'|')
+        hasher.update(chunk['hash'].encode('ascii'))
+    return hasher.hexdigest()
 
 
 def sanitize_relative_path(path_value):
@@ -252,8 +386,8 @@ def sanitize_relative_path(path_value):
     if not path_value:
         return ''
 
+    # Splitting on '/' and dropping empty parts also collapses repeated slashes
     normalized = path_value.replace('\\', '/').strip()
-    normalized = re.sub(r'/+', '/', normalized)
     safe_parts = [
         part for part in normalized.split('/')
         if part not in ('', '.', '..')
@@ -261,26 +395,126 @@ def sanitize_relative_path(path_value):
     return '/'.join(safe_parts)
 
 
+def hash_chunk(chunk_view):
+    """Return the SHA-256 hex digest of a single chunk."""
+    return hashlib.sha256(chunk_view).hexdigest()
+
+
+def get_readinto(stream):
+    """
+    Return the stream's readinto, or an equivalent built on read() for streams
+    without one (SpooledTemporaryFile only gained readinto in Python 3.11).
+    """
+    readinto = getattr(stream, 'readinto', None)
+    if readinto is not None:
+        return readinto
+
+    def readinto_from_read(view):
+        data = stream.read(len(view))
+        view[:len(data)] = data
+        return len(data)
+    return readinto_from_read
+
+
+def store_upload(file_id, stream, total_size):
+    """
+    Copy an upload stream into its backing file and build its chunk manifest in
+    the same pass. Each chunk is read into a reusable buffer, hashed and
+    written out. The backing file is named after file_id in STORAGE_FOLDER and
+    is removed again if anything fails. Nothing stays open afterwards, so
+    stored files don't hold a file descriptor each. Returns the path, the
+    manifest and its signature.
+    """
+    path = os.path.join(app.config['STORAGE_FOLDER'], file_id)
+    try:
+        with open(path, 'wb') as backing:
+            # Reserve the space up front so a full disk fails before the upload is read
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(backing.fileno(), 0, total_size)
+            buffer_view = memoryview(bytearray(CHUNK_SIZE))
+            readinto = get_readinto(stream)
+            chunks = []
+
+            for index, offset in enumerate(range(0, total_size, CHUNK_SIZE)):
+                chunk_view = buffer_view[:min(CHUNK_SIZE, total_size - offset)]
+                filled = 0
+                while filled < len(chunk_view):
+                    read = readinto(chunk_view[filled:])
+                    if not read:
+                        raise ValueError('Upload ended before the expected size')
+                    filled += read
+                backing.write(chunk_view)
+                chunks.append({
+                    'index': index,
+                    'offset': offset,
+                    'size': len(chunk_view),
+                    'hash': hash_chunk(chunk_view)
+                })
+
+        manifest = {
+            'file_id': file_id,
+            'chunk_size': CHUNK_SIZE,
+            'total_size': total_size,
+            'chunks': chunks
+        }
+        return path, manifest, compute_manifest_signature(manifest)
+    except BaseException:
+        discard_stored_file(path)
+        raise
+
+
+def extract_stored_metadata(metadata):
+    """Run type-specific metadata extraction over a stored file without reading it all into memory."""
+    with open(metadata['path'], 'rb') as stored:
+        return extract_metadata(stored, metadata['file_type'], metadata['mime_type'])
+
+
+def send_stored_file(metadata, as_attachment):
+    """Serve a stored file from its path with ETag and Range support."""
+    try:
+        return send_file(
+            metadata['path'],
+            mimetype=metadata['mime_type'],
+            as_attachment=as_attachment,
+            download_name=metadata['filename'],
+            conditional=True,
+            etag=metadata['manifest_signature']
+        )
+    except RequestedRangeNotSatisfiable as exc:
+        return exc.get_response()
+
+
+def iter_file_content(path):
+    """Yield a stored file in CHUNK_SIZE pieces, keeping it open only while it is read."""
+    with open(path, 'rb') as stored:
+        while True:
+            chunk = stored.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def build_zip_stream(file_records):
+    """
+    Build an uncompressed, sized ZipStream of the given file records. Sizes are
+    known up front, so the archive length is too and can be sent as
+    Content-Length while entries are streamed chunk by chunk.
+    """
+    # Shared files are mostly media that is already compressed, so just store them
+    zs = ZipStream(compress_type=ZIP_STORED, sized=True)
+    for metadata in file_records:
+        zs.add(iter_file_content(metadata['path']), metadata['filename'], size=metadata['size'])
+    return zs
+
+
 def resolve_file_metadata(file_id, room_code=None):
     """
-    Look up file metadata, optionally within a specific room.
+    Look up file metadata within a specific room.
     """
-    # First check room-based storage
-    if room_code and room_code in rooms:
-        room_files = rooms[room_code].get('files', {})
-        if file_id in room_files:
-            metadata = room_files[file_id]
-            if 'content' not in metadata:
-                raise ValueError('Missing file content')
-            if 'manifest' not in metadata or 'manifest_signature' not in metadata:
-                raise ValueError('Missing manifest data')
-            return metadata
-    
-    # Fallback to legacy global storage
-    metadata = file_metadata.get(file_id)
+    metadata = get_room_files(room_code).get(file_id)
     if not metadata:
         raise KeyError('File not found')
-    if 'content' not in metadata:
+    if 'path' not in metadata:
         raise ValueError('Missing file content')
     if 'manifest' not in metadata or 'manifest_signature' not in metadata:
         raise ValueError('Missing manifest data')
@@ -297,9 +531,12 @@ def create_room():
     room_code = generate_room_code()
     rooms[room_code] = {
         'files': {},
+        'file_listing': {},
         'devices': {},
-        'created_at': datetime.now().isoformat(),
-        'last_activity': datetime.now().isoformat()
+        'device_list_cache': None,
+        'lock': threading.Lock(),
+        'created_at': now_iso(),
+        'last_activity': now_iso()
     }
     set_current_room(room_code)
     print(f'Room created: {room_code}')
@@ -322,7 +559,7 @@ def join_room_api(room_code):
         return jsonify({'error': f'Room is full ({current_devices}/{MAX_DEVICES_PER_ROOM} devices)'}), 403
     
     set_current_room(room_code)
-    rooms[room_code]['last_activity'] = datetime.now().isoformat()
+    rooms[room_code]['last_activity'] = now_iso()
     
     # Count files in room
     file_count = len(rooms[room_code].get('files', {}))
@@ -365,12 +602,12 @@ def room_devices():
     devices = get_room_devices(room_code)
     device_list = [
         {
-            'id': sid[:8],  # Shortened ID for privacy
+            'id': info['short_id'],
             'name': info.get('name', 'Unknown'),
             'platform': info.get('platform', 'Unknown'),
             'joined_at': info.get('joined_at')
         }
-        for sid, info in devices.items()
+        for info in devices.values()
     ]
     return jsonify({'devices': device_list, 'count': len(device_list)})
 
@@ -433,33 +670,17 @@ def handle_join_room(data):
     
     print(f'Client {request.sid[:8]} joined room: {room_code}')
     
-    # Send all files in the room to the newly joined client
+    # Send all files in the room to the newly joined client as one event
     room_files = rooms[room_code].get('files', {})
-    for file_id, metadata in room_files.items():
-        emit('file_available', {
-            'file_id': file_id,
-            'filename': metadata['filename'],
-            'file_type': metadata['file_type'],
-            'mime_type': metadata['mime_type'],
-            'size': metadata['size'],
-            'size_display': format_file_size(metadata['size']),
-            'device_info': metadata['device_info'],
-            'safe_path': metadata.get('safe_path', metadata['filename']),
-            'chunks': len(metadata['manifest']['chunks']),
-            'uploaded_at': metadata['created_at']
-        })
+    emit('files_snapshot', {'files': list(rooms[room_code]['file_listing'].values())})
     
-    # Get updated device list
-    devices = get_room_devices(room_code)
-    device_list = [
-        {'id': sid[:8], 'name': info.get('name', 'Unknown'), 'platform': info.get('platform')}
-        for sid, info in devices.items()
-    ]
+    # Get updated device list; the same list serves the count and the broadcast
+    device_list = get_device_list(room_code)
     
     emit('room_joined', {
         'room_code': room_code, 
         'file_count': len(room_files),
-        'device_count': len(devices)
+        'device_count': len(device_list)
     })
     
     # Broadcast updated device list to all in room
@@ -471,16 +692,14 @@ def handle_leave_room(data):
     room_code = data.get('room_code', '').upper()
     if room_code:
         leave_room(room_code)
-        # Remove device tracking
-        remove_device_from_room(request.sid)
+        # Remove device tracking; only a device that was actually in a room affects its upload
+        left_room = remove_device_from_room(request.sid)
+        if left_room:
+            release_upload_device(left_room, request.sid)
         
         # Broadcast updated device list
         if room_code in rooms:
-            devices = get_room_devices(room_code)
-            device_list = [
-                {'id': sid[:8], 'name': info.get('name', 'Unknown'), 'platform': info.get('platform')}
-                for sid, info in devices.items()
-            ]
+            device_list = get_device_list(room_code)
             socketio.emit('devices_updated', {'devices': device_list, 'count': len(device_list)}, room=room_code)
         
         print(f'Client {request.sid[:8]} left room: {room_code}')
@@ -489,12 +708,10 @@ def handle_leave_room(data):
 def handle_disconnect():
     # Clean up device from any room they were in
     room_code = remove_device_from_room(request.sid)
+    if room_code:
+        release_upload_device(room_code, request.sid)
     if room_code and room_code in rooms:
-        devices = get_room_devices(room_code)
-        device_list = [
-            {'id': sid[:8], 'name': info.get('name', 'Unknown'), 'platform': info.get('platform')}
-            for sid, info in devices.items()
-        ]
+        device_list = get_device_list(room_code)
         socketio.emit('devices_updated', {'devices': device_list, 'count': len(device_list)}, room=room_code)
     print(f'Client disconnected: {request.sid[:8]}')
 
@@ -513,6 +730,13 @@ def handle_file_request(data):
         emit('file_error', {'error': str(exc)})
         return
     
+    # Open before announcing the transfer so a file deleted in the meantime is reported
+    try:
+        stored = open(metadata['path'], 'rb')
+    except FileNotFoundError:
+        emit('file_error', {'error': 'File not found'})
+        return
+    
     manifest = metadata['manifest']
     emit('file_manifest', {
         'file_id': file_id,
@@ -523,111 +747,194 @@ def handle_file_request(data):
         'manifest_signature': metadata['manifest_signature']
     })
 
-    try:
-        file_bytes = base64.b64decode(metadata['content'])
-    except (ValueError, binascii.Error) as exc:
-        emit('file_error', {'error': f'Corrupted file content: {exc}'})
-        return
+    # Stream chunks from a background task so this handler returns right away
+    socketio.start_background_task(send_file_chunks, request.sid, file_id, metadata, stored)
 
-    for chunk in manifest['chunks']:
-        start = chunk['offset']
-        end = start + chunk['size']
-        chunk_bytes = file_bytes[start:end]
-        emit('file_chunk', {
-            'file_id': file_id,
-            'chunk_index': chunk['index'],
-            'size': chunk['size'],
-            'hash': chunk['hash'],
-            'content': base64.b64encode(chunk_bytes).decode('utf-8')
-        })
 
-    emit('file_transfer_complete', {'file_id': file_id})
+def send_file_chunks(sid, file_id, metadata, stored):
+    """
+    Emit a file's chunks to one client from its open stored file, yielding to
+    other greenlets between batches. Stops early if the client disconnects and
+    closes the file either way.
+    """
+    chunks = metadata['manifest']['chunks']
+    with stored:
+        # Group chunks so each event carries several; receivers split them back up
+        for batch_start in range(0, len(chunks), CHUNKS_PER_EMIT):
+            # Stop reading and emitting once the requester has gone away
+            if not socketio.server.manager.is_connected(sid, '/'):
+                return
+            socketio.emit('file_chunk_batch', {
+                'file_id': file_id,
+                'chunks': [
+                    {
+                        'chunk_index': chunk['index'],
+                        'size': chunk['size'],
+                        'hash': chunk['hash'],
+                        # bytes values are sent as binary Socket.IO attachments, so no base64 is needed
+                        'content': stored.read(chunk['size'])
+                    }
+                    for chunk in chunks[batch_start:batch_start + CHUNKS_PER_EMIT]
+                ]
+            }, to=sid)
+            socketio.sleep(0)
+
+    socketio.emit('file_transfer_complete', {'file_id': file_id}, to=sid)
 
 # =============================================================================
 # UPLOAD PROGRESS BROADCASTING (for receiving animation on other devices)
 # =============================================================================
 
-# Track active uploads: { room_code: { uploader_sid, filename, receiver_count, dismissed_count } }
+# Track active uploads: { room_code: { uploader_sid, filename, receiver_sids, dismissed_sids, lock } }
+# receiver_sids is the set of other devices in the room when the upload started
 active_uploads = {}
 
+# Latest upload_progress per (room_code, uploader_sid), broadcast at most every PROGRESS_FLUSH_INTERVAL
+pending_progress = {}
+progress_flusher = None
+PROGRESS_FLUSH_INTERVAL = 0.1
+
+
+def flush_upload_progress():
+    """Broadcast the latest progress of each upload, coalescing bursts into one emit per interval."""
+    while True:
+        socketio.sleep(PROGRESS_FLUSH_INTERVAL)
+        while pending_progress:
+            (room_code, uploader_sid), payload = pending_progress.popitem()
+            socketio.emit('receiving_progress', payload, room=room_code, skip_sid=[uploader_sid])
+
 
 @socketio.on('upload_start')
 def handle_upload_start(data):
     """Broadcast that a file upload has started."""
-    room_code = data.get('room_code', '').upper() or socket_to_room.get(request.sid)
-    print(f'[DEBUG] upload_start from {request.sid[:8]}, room: {room_code}, file: {data.get("filename")}')
-    if not room_code or room_code not in rooms:
+    sid = request.sid
+    room_code = data.get('room_code', '').upper() or socket_to_room.get(sid)
+    filename = data.get('filename', 'Unknown file')
+    print(f'[DEBUG] upload_start from {sid[:8]}, room: {room_code}, file: {filename}')
+    room = rooms.get(room_code)
+    if room is None:
         return
     
-    # Count receivers (other devices in room)
-    receiver_count = len(rooms[room_code].get('devices', {})) - 1
-    
     # Track this upload
+    pending_progress.pop((room_code, sid), None)
     active_uploads[room_code] = {
-        'uploader_sid': request.sid,
-        'filename': data.get('filename', 'Unknown file'),
-        'receiver_count': max(receiver_count, 0),
-        'dismissed_count': 0
+        'uploader_sid': sid,
+        'filename': filename,
+        'receiver_sids': set(room['devices']) - {sid},
+        'dismissed_sids': set(),
+        'lock': threading.Lock()
     }
     
     # Broadcast to other clients in the room (exclude sender)
     socketio.emit('receiving_file', {
-        'filename': data.get('filename', 'Unknown file'),
+        'filename': filename,
         'size': data.get('size', 0),
         'device_info': data.get('device_info', 'Unknown Device'),
         'progress': 0
-    }, room=room_code, skip_sid=[request.sid])
+    }, room=room_code, skip_sid=[sid])
 
 
 @socketio.on('upload_progress')
 def handle_upload_progress(data):
-    """Broadcast upload progress to other devices."""
-    room_code = data.get('room_code', '').upper() or socket_to_room.get(request.sid)
+    """Queue upload progress for the next coalesced broadcast to other devices."""
+    global progress_flusher
+    sid = request.sid
+    room_code = data.get('room_code', '').upper() or socket_to_room.get(sid)
     if not room_code:
         return
     
-    socketio.emit('receiving_progress', {
+    # Only the latest value per upload matters; older ones are overwritten
+    pending_progress[(room_code, sid)] = {
         'filename': data.get('filename', 'Unknown file'),
         'progress': data.get('progress', 0),
         'device_info': data.get('device_info', 'Unknown Device')
-    }, room=room_code, skip_sid=[request.sid])
+    }
+    if progress_flusher is None:
+        progress_flusher = socketio.start_background_task(flush_upload_progress)
 
 
 @socketio.on('upload_complete')
 def handle_upload_complete(data):
     """Broadcast that upload is complete."""
-    room_code = data.get('room_code', '').upper() or socket_to_room.get(request.sid)
-    print(f'[DEBUG] upload_complete from {request.sid[:8]}, room: {room_code}')
+    sid = request.sid
+    room_code = data.get('room_code', '').upper() or socket_to_room.get(sid)
+    print(f'[DEBUG] upload_complete from {sid[:8]}, room: {room_code}')
     if not room_code:
         return
     
-    # Clear active upload tracking
+    # Clear active upload tracking and flush queued progress so it can't arrive after completion
     active_uploads.pop(room_code, None)
+    skip_sid = [sid]
+    progress = pending_progress.pop((room_code, sid), None)
+    if progress:
+        socketio.emit('receiving_progress', progress, room=room_code, skip_sid=skip_sid)
     
     socketio.emit('receiving_complete', {
         'filename': data.get('filename', 'Unknown file'),
         'device_info': data.get('device_info', 'Unknown Device')
-    }, room=room_code, skip_sid=[request.sid])
+    }, room=room_code, skip_sid=skip_sid)
 
 
 @socketio.on('dismiss_receiving')
 def handle_dismiss_receiving(data):
     """Handle when a receiver dismisses the receiving notification."""
-    room_code = data.get('room_code', '').upper() or socket_to_room.get(request.sid)
-    if not room_code or room_code not in active_uploads:
+    sid = request.sid
+    room_code = data.get('room_code', '').upper() or socket_to_room.get(sid)
+    upload = active_uploads.get(room_code)
+    # Only devices that were receiving when the upload started get a say
+    if upload is None or sid not in upload['receiver_sids']:
         return
     
-    upload = active_uploads[room_code]
-    upload['dismissed_count'] += 1
-    print(f'[DEBUG] dismiss_receiving: {upload["dismissed_count"]}/{upload["receiver_count"]} dismissed')
+    with upload['lock']:
+        upload['dismissed_sids'].add(sid)
+        all_dismissed = all_receivers_dismissed(upload)
+    print(f'[DEBUG] dismiss_receiving: {len(upload["dismissed_sids"])}/{len(upload["receiver_sids"])} dismissed')
     
-    # If all receivers dismissed, notify the uploader to cancel
-    if upload['dismissed_count'] >= upload['receiver_count'] and upload['receiver_count'] > 0:
-        print(f'[DEBUG] All receivers dismissed, cancelling upload for {upload["uploader_sid"][:8]}')
-        socketio.emit('cancel_upload', {
-            'reason': 'All receiving devices dismissed the transfer'
-        }, to=upload['uploader_sid'])
+    if all_dismissed:
+        cancel_active_upload(room_code, upload)
+
+
+def all_receivers_dismissed(upload):
+    """Whether every remaining receiver has dismissed the upload. Call with upload['lock'] held."""
+    return bool(upload['receiver_sids']) and upload['dismissed_sids'] >= upload['receiver_sids']
+
+
+def cancel_active_upload(room_code, upload):
+    """Tell the uploader to cancel because nobody is watching the transfer any more."""
+    print(f'[DEBUG] All receivers dismissed, cancelling upload for {upload["uploader_sid"][:8]}')
+    socketio.emit('cancel_upload', {
+        'reason': 'All receiving devices dismissed the transfer'
+    }, to=upload['uploader_sid'])
+    active_uploads.pop(room_code, None)
+
+
+def release_upload_device(room_code, sid):
+    """
+    Update the room's active upload for a departing device. If it was the
+    uploader the upload can never complete, so it is dropped and receivers are
+    told it ended; a departing receiver stops counting towards the dismissals
+    needed to cancel. Devices that joined after the upload started are ignored.
+    """
+    pending_progress.pop((room_code, sid), None)
+    upload = active_uploads.get(room_code)
+    if upload is None:
+        return
+    if upload['uploader_sid'] == sid:
         active_uploads.pop(room_code, None)
+        socketio.emit('receiving_complete', {
+            'filename': upload['filename'],
+            'cancelled': True
+        }, room=room_code, skip_sid=[sid])
+        return
+    if sid not in upload['receiver_sids']:
+        return
+    with upload['lock']:
+        upload['receiver_sids'].discard(sid)
+        upload['dismissed_sids'].discard(sid)
+        all_dismissed = all_receivers_dismissed(upload)
+    
+    if all_dismissed:
+        cancel_active_upload(room_code, upload)
 
 
 @app.route('/upload', methods=['POST'])
@@ -649,51 +956,58 @@ def upload_file():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
 
-        # Read file content into memory
-        file_content = file.read()
-        file_size = len(file_content)
+        # Werkzeug spools uploads to a seekable stream, so the size is known up front
+        file.stream.seek(0, os.SEEK_END)
+        file_size = file.stream.tell()
+        file.stream.seek(0)
         
         if file_size == 0:
             return jsonify({'error': 'Empty file'}), 400
         
         # Generate unique file ID
-        file_id = str(uuid.uuid4())
-        manifest, manifest_signature = compute_chunk_manifest(file_id, file_content)
+        file_id = secrets.token_hex(16)
+        path, manifest, manifest_signature = store_upload(file_id, file.stream, file_size)
         
         # Store file metadata
-        file_type = get_file_type(file.filename)
-        mime_type = mimetypes.guess_type(file.filename)[0] or 'application/octet-stream'
+        guessed_mime = mimetypes.guess_type(file.filename)[0]
+        file_type = get_file_type(file.filename, guessed_mime)
+        mime_type = guessed_mime or 'application/octet-stream'
         
         metadata = {
             'filename': file.filename,
             'file_type': file_type,
             'mime_type': mime_type,
             'size': file_size,
-            'content': base64.b64encode(file_content).decode('utf-8'),
-            'created_at': datetime.now().isoformat(),
+            'path': path,
+            'created_at': now_iso(),
             'device_info': device_info,
             'safe_path': safe_relative_path,
             'manifest': manifest,
             'manifest_signature': manifest_signature,
+            'chunk_count': len(manifest['chunks']),
             'room_code': room_code
         }
+        # Header parsing for these types is cheap next to the upload itself
+        if file_type in UPLOAD_METADATA_TYPES:
+            metadata['extracted'] = extract_stored_metadata(metadata)
+        # The announcement never changes after upload, so build it once
+        metadata['broadcast_payload'] = {
+            'file_id': file_id,
+            'filename': file.filename,
+            'file_type': file_type,
+            'mime_type': mime_type,
+            'size': file_size,
+            'device_info': device_info,
+            'safe_path': safe_relative_path,
+            'chunks': metadata['chunk_count'],
+            'uploaded_at': metadata['created_at']
+        }
         
         # Add file to the room
         add_file_to_room(room_code, file_id, metadata)
         
         # Broadcast to all clients in the room
-        socketio.emit('file_available', {
-            'file_id': file_id,
-            'filename': file.filename,
-            'file_type': file_type,
-            'mime_type': metadata['mime_type'],
-            'size': metadata['size'],
-            'size_display': format_file_size(metadata['size']),
-            'device_info': metadata['device_info'],
-            'safe_path': metadata.get('safe_path', metadata['filename']),
-            'chunks': len(metadata['manifest']['chunks']),
-            'uploaded_at': metadata['created_at']
-        }, room=room_code)
+        socketio.emit('file_available', metadata['broadcast_payload'], room=room_code)
         
         print(f'File uploaded: {file.filename} (Room: {room_code})')
         
@@ -705,6 +1019,10 @@ def upload_file():
             'room_code': room_code
         })
                 
+    except OSError as e:
+        if e.errno == errno.ENOSPC:
+            return jsonify({'error': 'Server storage is full'}), 507
+        return jsonify({'error': str(e)}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -714,16 +1032,7 @@ def download_file(file_id):
         room_code = get_current_room()
         metadata = resolve_file_metadata(file_id, room_code)
         
-        file_content = base64.b64decode(metadata['content'])
-        
-        return Response(
-            file_content,
-            mimetype=metadata['mime_type'],
-            headers={
-                'Content-Disposition': f'attachment; filename="{metadata["filename"]}"',
-                'Content-Length': str(metadata['size'])
-            }
-        )
+        return send_stored_file(metadata, as_attachment=True)
     except KeyError:
         return jsonify({'error': 'File not found'}), 404
     except ValueError as exc:
@@ -749,12 +1058,11 @@ def file_info(file_id):
             'type': metadata['file_type'],
             'mime_type': metadata['mime_type'],
             'size': metadata['size'],
-            'size_display': format_file_size(metadata['size']),
             'created': metadata['created_at'],
             'device_info': metadata['device_info'],
             'safe_path': metadata.get('safe_path', metadata['filename']),
             'integrity': {
-                'chunks': len(metadata['manifest']['chunks']),
+                'chunks': metadata['chunk_count'],
                 'chunk_size': metadata['manifest']['chunk_size'],
                 'manifest_signature': metadata['manifest_signature']
             }
@@ -771,21 +1079,7 @@ def api_files():
         if not room_code or room_code not in rooms:
             return jsonify({'files': [], 'in_room': False, 'message': 'Not in a room'})
         
-        room_files = rooms[room_code].get('files', {})
-        files = []
-        for file_id, metadata in room_files.items():
-            files.append({
-                'file_id': file_id,
-                'filename': metadata['filename'],
-                'file_type': metadata['file_type'],
-                'mime_type': metadata['mime_type'],
-                'size': metadata['size'],
-                'size_display': format_file_size(metadata['size']),
-                'device_info': metadata['device_info'],
-                'safe_path': metadata.get('safe_path', metadata['filename']),
-                'uploaded_at': metadata['created_at'],
-                'chunks': len(metadata['manifest']['chunks'])
-            })
+        files = list(rooms[room_code]['file_listing'].values())
         return jsonify({'files': files, 'room_code': room_code, 'in_room': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -796,20 +1090,18 @@ def get_metadata(file_id):
         room_code = get_current_room()
         metadata = resolve_file_metadata(file_id, room_code)
         
-        # Decode content for extraction
-        try:
-            file_content = base64.b64decode(metadata['content'])
-        except (ValueError, binascii.Error):
-            return jsonify({'error': 'Corrupted file content'}), 500
-            
-        extracted = extract_metadata(file_content, metadata['file_type'], metadata['mime_type'])
+        # Stored bytes never change, so extract once and keep it with the file
+        extracted = metadata.get('extracted')
+        if extracted is None:
+            extracted = extract_stored_metadata(metadata)
+            metadata['extracted'] = extracted
         
         return jsonify({
             'filename': metadata['filename'],
             'base_info': {
                 'type': metadata['file_type'],
                 'mime_type': metadata['mime_type'], 
-                'size': format_file_size(metadata['size']),
+                'size': metadata['size'],
                 'uploaded': metadata['created_at']
             },
             'details': extracted
@@ -825,11 +1117,10 @@ def preview_file(file_id):
         room_code = get_current_room()
         metadata = resolve_file_metadata(file_id, room_code)
         
-        file_content = base64.b64decode(metadata['content'])
-        
         if metadata['file_type'] == 'text' or metadata['file_type'] == 'code':
             try:
-                content = file_content.decode('utf-8')
+                with open(metadata['path'], 'rb') as stored:
+                    content = str(stored.read(), 'utf-8')
                 return jsonify({
                     'content': content, 
                     'type': metadata['file_type'], 
@@ -838,18 +1129,13 @@ def preview_file(file_id):
                         'type': metadata['file_type'],
                         'mime_type': metadata['mime_type'],
                         'size': metadata['size'],
-                        'size_display': format_file_size(metadata['size']),
                         'created': metadata['created_at']
                     }
                 })
             except UnicodeDecodeError:
                 return jsonify({'error': 'File contains binary data and cannot be previewed as text'}), 400
         else:
-            return Response(
-                file_content,
-                mimetype=metadata['mime_type'],
-                headers={'Content-Disposition': f'inline; filename="{metadata["filename"]}"'}
-            )
+            return send_stored_file(metadata, as_attachment=False)
     except KeyError:
         return jsonify({'error': 'File not found'}), 404
     except ValueError as exc:
@@ -893,19 +1179,17 @@ def download_all():
         if not room_code or room_code not in rooms:
             return jsonify({'error': 'Not in a room'}), 400
         
-        room_files = rooms[room_code].get('files', {})
+        # Snapshot the file list so deletes during streaming don't break iteration
+        room_files = list(rooms[room_code].get('files', {}).values())
+        
+        zs = build_zip_stream(room_files)
         
-        memory_file = io.BytesIO()
-        with zipfile.ZipFile(memory_file, 'w') as zf:
-            for file_id, metadata in room_files.items():
-                content = base64.b64decode(metadata['content'])
-                zf.writestr(metadata['filename'], content)
-        memory_file.seek(0)
         return Response(
-            memory_file,
+            zs,
             mimetype='application/zip',
             headers={
-                'Content-Disposition': f'attachment; filename="ropix-room-{room_code}.zip"'
+                'Content-Disposition': f'attachment; filename="ropix-room-{room_code}.zip"',
+                'Content-Length': str(len(zs))
             }
         )
     except Exception as e:
@@ -918,8 +1202,14 @@ def delete_all():
         if not room_code or room_code not in rooms:
             return jsonify({'error': 'Not in a room'}), 400
         
-        file_count = len(rooms[room_code].get('files', {}))
-        rooms[room_code]['files'] = {}
+        room = rooms[room_code]
+        with room['lock']:
+            removed = room['files']
+            room['files'] = {}
+            room['file_listing'] = {}
+        for metadata in removed.values():
+            discard_stored_file(metadata['path'])
+        file_count = len(removed)
         
         # Broadcast to room
         socketio.emit('files_cleared', room=room_code)
@@ -956,4 +1246,5 @@ if __name__ == '__main__':
     print("Create or join a room to share files securely.")
     print("Only people with the room code can see your files.")
     print("==============================================\n")
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
+    # Development server only; production runs under gunicorn (see README)
+    socketio.run(app, debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0', port=5000)
\ No newline at end of file
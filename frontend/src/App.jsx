@@ -275,6 +275,11 @@ function App() {
       });
     });
 
+    // Full file list for the room, sent once when this socket joins
+    socket.on('files_snapshot', ({ files: snapshot }) => {
+      setFiles((snapshot || []).map(normalizeFile));
+    });
+
     socket.on('file_deleted', ({ file_id }) => {
       setFiles((prev) => prev.filter((file) => file.file_id !== file_id));
     });
@@ -290,18 +295,16 @@ function App() {
         .catch((error) => addToast(error.message, 'error'));
     });
 
-    socket.on('file_chunk', (data) => {
+    socket.on('file_chunk_batch', (data) => {
       transferManagerRef.current
-        .handleChunk(data)
+        .handleChunkBatch(data)
         .catch((error) => addToast(error.message, 'error'));
     });
 
     socket.on('file_transfer_complete', ({ file_id }) => {
-      try {
-        transferManagerRef.current.finalize(file_id);
-      } catch (error) {
-        addToast(error.message, 'error');
-      }
+      transferManagerRef.current
+        .finalize(file_id)
+        .catch((error) => addToast(error.message, 'error'));
     });
 
     socket.on('file_error', ({ error }) => addToast(error, 'error'));
@@ -1336,7 +1339,7 @@ function App() {
                     <div><div className="preview-label">Filename</div><div>{metadataModal.data.filename}</div></div>
                     <div><div className="preview-label">Type</div><div>{metadataModal.data.base_info.type}</div></div>
                     <div><div className="preview-label">MIME</div><div>{metadataModal.data.base_info.mime_type}</div></div>
-                    <div><div className="preview-label">Size</div><div>{metadataModal.data.base_info.size}</div></div>
+                    <div><div className="preview-label">Size</div><div>{formatFileSize(metadataModal.data.base_info.size)}</div></div>
                     <div><div className="preview-label">Uploaded</div><div>{new Date(metadataModal.data.base_info.uploaded).toLocaleString()}</div></div>
                   </div>
                 </section>
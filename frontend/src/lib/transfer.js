@@ -17,16 +17,6 @@ const computeManifestSignature = async (manifest) => {
   return sha256Hex(payloadBytes);
 };
 
-const base64ToUint8Array = (base64String) => {
-  const binaryString = atob(base64String);
-  const len = binaryString.length;
-  const bytes = new Uint8Array(len);
-  for (let i = 0; i < len; i += 1) {
-    bytes[i] = binaryString.charCodeAt(i);
-  }
-  return bytes;
-};
-
 export const createTransferManager = (onComplete) => {
   const sessions = new Map();
 
@@ -60,7 +50,8 @@ export const createTransferManager = (onComplete) => {
     if (!expected) {
       throw new Error(`Unexpected chunk index ${data.chunk_index}`);
     }
-    const chunkBytes = base64ToUint8Array(data.content);
+    // Chunks arrive as binary Socket.IO attachments (ArrayBuffer)
+    const chunkBytes = new Uint8Array(data.content);
     const digest = await sha256Hex(chunkBytes);
     if (digest !== expected.hash) {
       sessions.delete(data.file_id);
@@ -70,6 +61,9 @@ export const createTransferManager = (onComplete) => {
     transfer.receivedChunks += 1;
   };
 
+  const handleChunkBatch = (data) =>
+    Promise.all(data.chunks.map((chunk) => handleChunk({ file_id: data.file_id, ...chunk })));
+
   const finalize = (fileId) => {
     const transfer = sessions.get(fileId);
     if (!transfer) {
@@ -84,6 +78,20 @@ export const createTransferManager = (onComplete) => {
     sessions.delete(fileId);
   };
 
-  return { handleManifest, handleChunk, finalize };
+  // Socket events arrive in order, but the handlers await Web Crypto. Chain
+  // them so a manifest is verified before its chunks and chunks before finalize.
+  let queue = Promise.resolve();
+  const enqueue = (task) => {
+    const run = queue.then(task);
+    queue = run.catch(() => {});
+    return run;
+  };
+
+  return {
+    handleManifest: (data) => enqueue(() => handleManifest(data)),
+    handleChunk: (data) => enqueue(() => handleChunk(data)),
+    handleChunkBatch: (data) => enqueue(() => handleChunkBatch(data)),
+    finalize: (fileId) => enqueue(() => finalize(fileId)),
+  };
 };
 
@@ -44,31 +44,44 @@ def get_image_metadata(file_content_io):
         metadata['error'] = f"Error extracting image metadata: {str(e)}"
     return metadata
 
+# UTF-8 continuation bytes; every other byte starts a character
+UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
 def get_text_metadata(file_content_io):
     metadata = {}
     try:
-        content = file_content_io.read().decode('utf-8', errors='ignore')
-        metadata['lines'] = len(content.splitlines())
-        metadata['characters'] = len(content)
-        metadata['words'] = len(content.split())
+        # Count on the raw bytes in C-level passes instead of decoding to str first
+        data = file_content_io.read()
+        lines = data.count(b'\n')
+        if data and not data.endswith(b'\n'):
+            lines += 1
+        metadata['lines'] = lines
+        metadata['characters'] = len(data.translate(None, UTF8_CONTINUATION_BYTES))
+        metadata['words'] = len(data.split())
         metadata['encoding'] = 'utf-8 (assumed)'
     except Exception as e:
          metadata['error'] = f"Error analyzing text: {str(e)}"
     return metadata
 
+# Leading bytes of the archive formats we can list; anything else is skipped
+# without handing it to zipfile/tarfile
+ZIP_SIGNATURES = (b'PK\x03\x04', b'PK\x05\x06')  # local file header, empty archive
+TAR_COMPRESSION_SIGNATURES = (b'\x1f\x8b', b'BZh', b'\xfd7zXZ\x00')  # gzip, bzip2, xz
+
 def get_archive_metadata(file_content_io):
     metadata = {}
     try:
-        # Check for Zip
-        if zipfile.is_zipfile(file_content_io):
+        head = file_content_io.read(512)
+        file_content_io.seek(0)
+        if head.startswith(ZIP_SIGNATURES):
             with zipfile.ZipFile(file_content_io, 'r') as z:
-                metadata['file_count'] = len(z.namelist())
+                names = z.namelist()
+                metadata['file_count'] = len(names)
                 metadata['uncompressed_size'] = sum(zi.file_size for zi in z.infolist())
-                metadata['files'] = z.namelist()[:10]  # First 10 files
-                if len(z.namelist()) > 10:
-                    metadata['files'].append(f"... and {len(z.namelist()) - 10} more")
-        else:
-             file_content_io.seek(0)
+                metadata['files'] = names[:10]  # First 10 files
+                if len(names) > 10:
+                    metadata['files'].append(f"... and {len(names) - 10} more")
+        elif head[257:262] == b'ustar' or head.startswith(TAR_COMPRESSION_SIGNATURES):
              try:
                  with tarfile.open(fileobj=file_content_io) as t:
                      members = t.getmembers()
@@ -76,12 +89,16 @@ def get_archive_metadata(file_content_io):
                      metadata['uncompressed_size'] = sum(m.size for m in members)
                      metadata['files'] = [m.name for m in members[:10]]
              except tarfile.TarError:
-                 pass # Not a recognized archive
+                 pass # Compressed, but not a tarball
 
     except Exception as e:
           metadata['error'] = f"Error extracting archive metadata: {str(e)}"
     return metadata
 
+# ID3 picture frames (APIC:<desc>, PIC in ID3v2.2), MP4 and Vorbis/FLAC cover art
+COVER_ART_TAG_PREFIXES = ('APIC', 'PIC')
+COVER_ART_TAG_KEYS = {'covr', 'metadata_block_picture'}
+
 def get_audio_metadata(file_content_io):
     metadata = {}
     try:
@@ -100,8 +117,18 @@ def get_audio_metadata(file_content_io):
             metadata['tags'] = {}
             if audio.tags:
                 for key, value in audio.tags.items():
-                     # Simplify values to string
-                    metadata['tags'][key] = str(value)
+                    # Cover art frames hold embedded images, not text
+                    if key.startswith(COVER_ART_TAG_PREFIXES) or key.lower() in COVER_ART_TAG_KEYS:
+                        continue
+                    # ID3 text frames keep their values in a .text list, but USLT/USER
+                    # hold a single string there; anything else is simplified to string
+                    text = getattr(value, 'text', None)
+                    if isinstance(text, str):
+                        metadata['tags'][key] = text
+                    elif text is not None:
+                        metadata['tags'][key] = str(text[0]) if text else ''
+                    else:
+                        metadata['tags'][key] = str(value)
     except Exception as e:
         metadata['error'] = f"Error extracting audio metadata: {str(e)}"
     return metadata
@@ -125,12 +152,13 @@ def get_pdf_metadata(file_content_io):
          metadata['error'] = f"Error extracting PDF metadata: {str(e)}"
     return metadata
 
-def extract_metadata(file_content_bytes, file_type, mime_type):
+def extract_metadata(file_content, file_type, mime_type):
     """
-    Main entry point for metadata extraction.
+    Main entry point for metadata extraction. file_content is bytes or a
+    seekable binary file object positioned at the start.
     """
     metadata = {}
-    file_io = io.BytesIO(file_content_bytes)
+    file_io = file_content if hasattr(file_content, 'read') else io.BytesIO(file_content)
     
     if file_type == 'image':
         metadata = get_image_metadata(file_io)